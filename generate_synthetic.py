@@ -2,10 +2,12 @@
 # generate_synthetic.py — create synthetic OCR-like bounding boxes
 ########################
 
-import json
 import math
 import random
-from typing import List, Tuple
+import numpy as np
+import orjson
+from typing import List
+from table_utilities import rotate_boxes
 
 
 # ────────────────────────────────
@@ -21,33 +23,27 @@ ROWS = [
 ]
 
 
-def make_quad(text: str, x: float, y: float, w: float = 0.08, h: float = 0.03) -> dict:
+def make_quads(origins: np.ndarray, w: float = 0.08, h: float = 0.03) -> np.ndarray:
     ########################
-    # Create an axis-aligned quadrilateral for text box
+    # Create axis-aligned quadrilaterals for text boxes
+    # origins (N,2) are top-left corners; returns coords (N,4,2)
     ########################
-    coords = [
-        (x, y),          # top-left
-        (x + w, y),      # top-right
-        (x + w, y + h),  # bottom-right
-        (x, y + h),      # bottom-left
-    ]
-    return {"text": text, "coords": coords}
+    offsets = np.array([
+        (0, 0),  # top-left
+        (w, 0),  # top-right
+        (w, h),  # bottom-right
+        (0, h),  # bottom-left
+    ], dtype=np.float64)
+    return np.asarray(origins, dtype=np.float64)[:, None, :] + offsets
 
 
-def rotate_point(x: float, y: float, angle: float, cx: float = 0.5, cy: float = 0.5) -> Tuple[float, float]:
-    x_shift, y_shift = x - cx, y - cy
-    x_rot = x_shift * math.cos(angle) - y_shift * math.sin(angle)
-    y_rot = x_shift * math.sin(angle) + y_shift * math.cos(angle)
-    return x_rot + cx, y_rot + cy
-
-
-def apply_skew(boxes: List[dict], max_angle: float = 4) -> List[dict]:
-    skewed = []
-    for b in boxes:
-        coords = b["coords"]
-        cx = sum(x for x, _ in coords) / 4
-        cy = sum(y for _, y in coords) / 4
-
+def skew_coords(coords: np.ndarray, max_angle: float = 4) -> np.ndarray:
+    ########################
+    # Rotate each box in coords (N,4,2) about the page center by a
+    # random angle whose sign depends on the box's quadrant
+    ########################
+    angles = np.empty(len(coords))
+    for i, (cx, cy) in enumerate(coords.mean(axis=1).tolist()):
         if cx < 0.5 and cy < 0.5:
             angle = math.radians(random.uniform(-max_angle, 0))   # top-left
         elif cx >= 0.5 and cy < 0.5:
@@ -56,33 +52,44 @@ def apply_skew(boxes: List[dict], max_angle: float = 4) -> List[dict]:
             angle = math.radians(random.uniform(0, max_angle))    # bottom-left
         else:
             angle = math.radians(random.uniform(-max_angle, 0))   # bottom-right
+        angles[i] = angle
 
-        new_coords = [rotate_point(x, y, angle) for x, y in coords]
-        skewed.append({"text": b["text"], "coords": new_coords})
+    ########################
+    # rotate_boxes turns by -angle, so negate to skew by +angle
+    ########################
+    return rotate_boxes(coords, -angles, 0.5, 0.5)
 
-    return skewed
+
+def apply_skew(boxes: List[dict], max_angle: float = 4) -> List[dict]:
+    if not boxes:
+        return []
+
+    coords = np.asarray([b["coords"] for b in boxes], dtype=np.float64)
+    rotated = skew_coords(coords, max_angle)
+
+    return [{"text": b["text"], "coords": pts} for b, pts in zip(boxes, rotated.tolist())]
 
 
 def generate_synthetic(rows=ROWS, headers=HEADERS, out_path="sample_data/ocr_output.json"):
-    boxes = []
-    for i, h in enumerate(headers):
-        x = 0.1 + i * 0.15
-        boxes.append(make_quad(h, x, 0.1))
+    ########################
+    # Header row at y=0.1, item rows from y=0.2 in 0.08 steps,
+    # columns from x=0.1 in 0.15 steps; empty cells are skipped
+    ########################
+    cells = [(h, i, -1) for i, h in enumerate(headers)]
+    cells += [(val, i, r) for r, row in enumerate(rows) for i, val in enumerate(row) if val]
+
+    texts = [text for text, _, _ in cells]
+    col_idx, row_idx = np.array([(i, r) for _, i, r in cells], dtype=np.float64).reshape(-1, 2).T
 
-    for r, row in enumerate(rows):
-        y = 0.2 + r * 0.08
-        for i, val in enumerate(row):
-            if not val:
-                continue
-            x = 0.1 + i * 0.15
-            boxes.append(make_quad(val, x, y))
+    xs = 0.1 + col_idx * 0.15
+    ys = np.where(row_idx < 0, 0.1, 0.2 + row_idx * 0.08)
 
-    skewed = apply_skew(boxes)
+    skewed = skew_coords(make_quads(np.column_stack([xs, ys])))
 
-    output = {"blocks": skewed}
+    output = {"blocks": [{"text": t, "coords": pts} for t, pts in zip(texts, skewed.tolist())]}
 
-    with open(out_path, "w") as f:
-        json.dump(output, f, indent=2)
+    with open(out_path, "wb") as f:
+        f.write(orjson.dumps(output, option=orjson.OPT_INDENT_2))
 
     print(f"Synthetic OCR polygons saved to {out_path}")
 
@@ -3,23 +3,22 @@
 ########################
 
 import json
-import math
+import re
 import numpy as np
 from typing import List
 import matplotlib.pyplot as plt
-from shapely.affinity import rotate
-from shapely.geometry import Polygon
-from table_utilities import OCRBox, load_ocr_json, correct_slope
+from matplotlib.collections import LineCollection, PolyCollection
+from table_utilities import OCRBox, load_ocr_json, correct_slope, stack_coords
 
 
 # ────────────────────────────────
 # Quadrant Helper
 # ────────────────────────────────
 def get_quadrant(cx: float, cy: float) -> int:
-    if cx < 0.5 and cy < 0.5: return 0
-    if cx >= 0.5 and cy < 0.5: return 1
-    if cx < 0.5 and cy >= 0.5: return 2
-    return 3
+    ########################
+    # - 0 = top-left, 1 = top-right, 2 = bottom-left, 3 = bottom-right
+    ########################
+    return int(cx >= 0.5) + 2 * int(cy >= 0.5)
 
 QUAD_COLORS = {0:"red", 1:"blue", 2:"purple", 3:"green"}
 
@@ -29,96 +28,135 @@ QUAD_COLORS = {0:"red", 1:"blue", 2:"purple", 3:"green"}
 # ────────────────────────────────
 def box_angle(b: OCRBox) -> float:
     ########################
-    # - Return angle (degrees) of top edge
+    # - Return angle (degrees) of top edge, cached on the box
     ########################
-    (x0,y0), (x1,y1), *_ = b.coords
-    angle_rad = math.atan2(y1 - y0, x1 - x0)
-    return math.degrees(angle_rad)
+    return b.angle_deg
 
 
 def cluster_rows(y_values, tol=0.02):
     ########################
     # - Collapse nearby y-values into a single representative (mean)
     # - Example: [0.11,0.12,0.13,0.21,0.22] → [0.12, 0.215]
+    # - Keeps a running sum/count so each group mean is O(1) per step
     ########################
-    if not y_values:
+    if len(y_values) == 0:
         return []
     clustered = []
-    current_group = [y_values[0]]
+    group_sum, group_count = y_values[0], 1
 
     for y in y_values[1:]:
-        if abs(y - np.mean(current_group)) <= tol:
-            current_group.append(y)
+        if abs(y - group_sum / group_count) <= tol:
+            group_sum += y
+            group_count += 1
         else:
-            clustered.append(np.mean(current_group))
-            current_group = [y]
-    clustered.append(np.mean(current_group))
+            clustered.append(group_sum / group_count)
+            group_sum, group_count = y, 1
+    clustered.append(group_sum / group_count)
     return clustered
 
 
+def any_word_regex(words: List[str]) -> re.Pattern:
+    ########################
+    # - Case-insensitive regex matching any of words as a substring
+    # - An empty word list matches nothing
+    ########################
+    if not words:
+        return re.compile(r"(?!)")
+    return re.compile("|".join(re.escape(w) for w in words), re.IGNORECASE)
+
+
+def box_text_flags(boxes: List[OCRBox], headers: List[str], footers: List[str]):
+    ########################
+    # - Match box texts against headers/footers once per plot
+    # - Returns lowercased texts plus per-box boolean arrays:
+    #     texts_lc:   lowercased box text
+    #     is_label:   box text is (part of) a header name
+    #     has_header: a header name appears in the box text
+    #     has_footer: a footer name appears in the box text
+    ########################
+    header_re = any_word_regex(headers)
+    footer_re = any_word_regex(footers)
+    headers_lc = tuple(h.lower() for h in headers)
+
+    texts_lc = [b.text.lower() for b in boxes]
+    is_label = np.array([bool(t) and any(t in h for h in headers_lc) for t in texts_lc], dtype=bool)
+    has_header = np.array([bool(header_re.search(b.text)) for b in boxes], dtype=bool)
+    has_footer = np.array([bool(footer_re.search(b.text)) for b in boxes], dtype=bool)
+    return texts_lc, is_label, has_header, has_footer
+
+
 def plot_table_grid(ax, boxes: List[OCRBox], headers: List[str], footers: List[str], title: str):
     ########################
     # - Draw table before corrections
     ########################
-    all_x = [x for b in boxes for (x, _) in b.coords]
-    all_y = [y for b in boxes for (_, y) in b.coords]
-    x_min, x_max = min(all_x), max(all_x)
-    y_min, y_max = min(all_y), max(all_y)
+    coords = stack_coords(boxes)
+    xs, ys = coords[:, :, 0], coords[:, :, 1]
+    x_min, x_max = xs.min(), xs.max()
+    y_min, y_max = ys.min(), ys.max()
 
-    header_boxes = [b for b in boxes if b.text.lower() and any(b.text.lower() in h.lower() for h in headers)]
+    texts_lc, is_label, has_header, has_footer = box_text_flags(boxes, headers, footers)
 
-    lefts = [min(x for x, _ in b.coords) for b in header_boxes]
-    right = max(max(x for x, _ in b.coords) for b in header_boxes)
-    col_edges = sorted(lefts + [right])
+    label_xs = xs[is_label]
+    col_edges = np.sort(np.append(label_xs.min(axis=1), label_xs.max()))
 
-    header_top = min(y for b in boxes if any(h.lower() in b.text.lower() for h in headers) for (_, y) in b.coords)
-    footer_bottom = max(y for b in boxes if any(f.lower() in b.text.lower() for f in footers) for (_, y) in b.coords)
+    header_top = ys[has_header].min()
+    footer_bottom = ys[has_footer].max()
 
-    raw_item_rows = sorted({round(b.center[1], 3) for b in boxes if (header_top*1.15) < b.center[1] < (footer_bottom*.85)})
+    cys = coords[:, :, 1].mean(axis=1)
+    raw_item_rows = np.sort(cys[(cys > header_top*1.15) & (cys < footer_bottom*.85)]).tolist()
     item_rows = cluster_rows(raw_item_rows, tol=0.02)
 
     n_items = len(item_rows)
     n_rows = 1 + n_items + 1
 
     row_edges = np.linspace(header_top, footer_bottom, n_rows + 1)
-
-    row_edges = [r for r in row_edges if r <= footer_bottom]
+    row_edges = row_edges[row_edges <= footer_bottom]
 
     row_height = 0.01
     padding = row_height * 0.02
 
-    ax.plot([x_min, x_max], [y_min - padding, y_min - padding], color="black", linewidth=1.5)
-    ax.plot([x_min, x_max], [y_max + padding, y_max + padding], color="black", linewidth=1.5)
-    ax.plot([x_min, x_min], [y_min - padding, y_max + padding], color="black", linewidth=1.5)
-    ax.plot([x_max, x_max], [y_min - padding, y_max + padding], color="black", linewidth=1.5)
+    ########################
+    # - Collect every grid line and draw them as one LineCollection
+    ########################
+    y_lo, y_hi = y_min - padding, y_max + padding
+    segs = [
+        [(x_min, y_lo), (x_max, y_lo)],
+        [(x_min, y_hi), (x_max, y_hi)],
+        [(x_min, y_lo), (x_min, y_hi)],
+        [(x_max, y_lo), (x_max, y_hi)],
+    ]
+    line_colors, line_widths = ["black"] * 4, [1.5] * 4
 
     for x in col_edges[1:-1]:
-        ax.plot([x, x], [y_min - padding, y_max + padding], color="lightgray", linewidth=0.8)
+        segs.append([(x, y_lo), (x, y_hi)])
+        line_colors.append("lightgray")
+        line_widths.append(0.8)
 
     for i, y in enumerate(row_edges):
         y_top = y - padding / 2
-        y_bottom = y + padding / 2
 
         is_header = (i == 0)
         is_total = (abs(y - footer_bottom) < 1e-3) if footer_bottom else False
-        lw = 1.5 if (is_header or is_total) else 0.8
 
-        ax.plot([x_min, x_max], [y_top, y_top], color="black" if (is_header or is_total) else "gray", linewidth=lw)
+        segs.append([(x_min, y_top), (x_max, y_top)])
+        line_colors.append("black" if (is_header or is_total) else "gray")
+        line_widths.append(1.5 if (is_header or is_total) else 0.8)
+
+    ax.add_collection(LineCollection(segs, colors=line_colors, linewidths=line_widths, capstyle="projecting"))
 
-    for b in boxes:
+    colors = [QUAD_COLORS[get_quadrant(*b.center)] for b in boxes]
+    ax.add_collection(PolyCollection(coords, facecolors="none", edgecolors=colors, linewidths=0.8))
+
+    for b, t, hh, hf, color in zip(boxes, texts_lc, has_header, has_footer, colors):
         cx, cy = b.center
-        angle = box_angle(b)
+        angle = b.angle_deg
 
-        is_header = any(h.lower() in b.text.lower() for h in headers) and b.text.lower() not in footers
-        is_total  = any(f.lower() in b.text.lower() for f in footers) and b.text.lower() not in headers
+        is_header = hh and t not in footers
+        is_total  = hf and t not in headers
 
         fontweight = "bold" if (is_header or is_total) else "normal"
         fontsize = 8 if (is_header or is_total) else 7
 
-        color = QUAD_COLORS[get_quadrant(cx, cy)]
-        poly = plt.Polygon(b.coords, fill=False, edgecolor=color, linewidth=0.8)
-        ax.add_patch(poly)
-
         ax.text(
             cx, cy, b.text,
             fontsize=fontsize, weight=fontweight,
@@ -138,26 +176,24 @@ def plot_table_grid_auto(ax, boxes: List[OCRBox], headers: List[str], footers: L
     ########################
     # - Draw reconstructed table
     ########################
-    all_x = [x for b in boxes for (x, _) in b.coords]
-    all_y = [y for b in boxes for (_, y) in b.coords]
-    x_min, x_max = min(all_x), max(all_x)
-    y_min, y_max = min(all_y), max(all_y)
+    coords = stack_coords(boxes)
+    xs, ys = coords[:, :, 0], coords[:, :, 1]
+    x_min, x_max = xs.min(), xs.max()
+    y_min, y_max = ys.min(), ys.max()
 
-    header_boxes = [b for b in boxes if b.text.lower() and any(b.text.lower() in h.lower() for h in headers)]
+    texts_lc, is_label, has_header, has_footer = box_text_flags(boxes, headers, footers)
 
-    if header_boxes:
-        lefts = [min(x for x, _ in b.coords) for b in header_boxes]
-        right = max(max(x for x, _ in b.coords) for b in header_boxes)
-        col_edges = sorted(lefts + [right])
+    if is_label.any():
+        label_xs = xs[is_label]
+        col_edges = np.sort(np.append(label_xs.min(axis=1), label_xs.max()))
     else:
         col_edges = np.linspace(x_min, x_max, len(headers)+1)
 
-    n_cols = len(col_edges) - 1
+    header_top = ys[has_header].min()
+    footer_bottom = ys[has_footer].max()
 
-    header_top = min(y for b in boxes if any(h.lower() in b.text.lower() for h in headers) for (_, y) in b.coords)
-    footer_bottom = max(y for b in boxes if any(f.lower() in b.text.lower() for f in footers) for (_, y) in b.coords)
-
-    raw_item_rows = sorted({round(b.center[1], 3) for b in boxes if (header_top*1.2) < b.center[1] < (footer_bottom*.8)})
+    cxs, cys = coords.mean(axis=1).T
+    raw_item_rows = np.sort(cys[(cys > header_top*1.2) & (cys < footer_bottom*.8)]).tolist()
     item_rows = cluster_rows(raw_item_rows, tol=0.02)
 
     n_items = len(item_rows)
@@ -165,30 +201,48 @@ def plot_table_grid_auto(ax, boxes: List[OCRBox], headers: List[str], footers: L
 
     row_edges = np.linspace(header_top, footer_bottom, n_rows + 1)
 
-    ax.plot([x_min, x_max], [y_min, y_min], color="black", linewidth=1.5)
-    ax.plot([x_min, x_max], [footer_bottom, footer_bottom], color="black", linewidth=1.5)
-    ax.plot([x_min, x_min], [y_min, footer_bottom], color="black", linewidth=1.5)
-    ax.plot([x_max, x_max], [y_min, footer_bottom], color="black", linewidth=1.5)
+    ########################
+    # - Collect every grid line and draw them as one LineCollection
+    ########################
+    segs = [
+        [(x_min, y_min), (x_max, y_min)],
+        [(x_min, footer_bottom), (x_max, footer_bottom)],
+        [(x_min, y_min), (x_min, footer_bottom)],
+        [(x_max, y_min), (x_max, footer_bottom)],
+    ]
+    line_colors, line_widths = ["black"] * 4, [1.5] * 4
 
     for x in col_edges[1:-1]:
-        ax.plot([x, x], [y_min, footer_bottom], color="gray", linewidth=0.8)
+        segs.append([(x, y_min), (x, footer_bottom)])
+        line_colors.append("gray")
+        line_widths.append(0.8)
 
     for y in row_edges[1:-1]:
         is_header_line = abs(y - row_edges[1]) < 1e-3
         is_footer_line = abs(y - row_edges[-2]) < 1e-3
-        lw = 1.5 if (is_header_line or is_footer_line) else 0.8
-        ax.plot([x_min, x_max], [y, y], color="black", linewidth=lw)
 
-    row_centers = [(row_edges[i] + row_edges[i+1]) / 2 for i in range(n_rows)]
-    col_centers = [(col_edges[i] + col_edges[i+1]) / 2 for i in range(n_cols)]
+        segs.append([(x_min, y), (x_max, y)])
+        line_colors.append("black")
+        line_widths.append(1.5 if (is_header_line or is_footer_line) else 0.8)
 
-    for b in boxes:
-        cx, cy = b.center
-        nearest_row = min(row_centers, key=lambda r: abs(cy - r))
-        nearest_col = min(col_centers, key=lambda c: abs(cx - c))
+    ax.add_collection(LineCollection(segs, colors=line_colors, linewidths=line_widths, capstyle="projecting"))
+
+    row_centers = (row_edges[:-1] + row_edges[1:]) / 2
+    col_centers = (col_edges[:-1] + col_edges[1:]) / 2
+
+    ########################
+    # - Centers are sorted, so the nearest one is found by binary search
+    #   against the midpoints between neighbouring centers
+    ########################
+    row_idx = np.searchsorted((row_centers[:-1] + row_centers[1:]) / 2, cys)
+    col_idx = np.searchsorted((col_centers[:-1] + col_centers[1:]) / 2, cxs)
+
+    for i, (b, t, hh) in enumerate(zip(boxes, texts_lc, has_header)):
+        nearest_row = row_centers[row_idx[i]]
+        nearest_col = col_centers[col_idx[i]]
 
-        is_header = any(h.lower() in b.text.lower() for h in headers)
-        is_total = "total" in b.text.lower()
+        is_header = hh
+        is_total = "total" in t
 
         fontweight = "bold" if (is_header or is_total) else "normal"
         fontsize = 8 if (is_header or is_total) else 7
@@ -3,47 +3,96 @@
 # - Defines OCRBox and helpers for slope correction and table extraction
 ########################
 
-import json
 import math
 import numpy as np
-from typing import List, Dict, Any, Tuple
+import orjson
+from numba import njit
+from typing import List, Dict, Any, Optional, Tuple
 
 
 # ────────────────────────────────
 # Data Structures
 # ────────────────────────────────
 class OCRBox:
-    def __init__(self, text: str, coords: List[Tuple[float, float]]):
+    __slots__ = ("text", "_tensor", "_index", "center", "width", "height", "slope", "angle_deg")
+
+    def __init__(self, text: str, coords: List[Tuple[float, float]], index: Optional[int] = None):
         ########################
         # coords = [(x0,y0), (x1,y1), (x2,y2), (x3,y3)]
         # Order: top-left, top-right, bottom-right, bottom-left
+        # With index given, coords is instead a shared read-only (N,4,2)
+        # float64 tensor and this box is row index of it (no copy)
+        # center/width/height/slope and the top-edge angle (degrees) are
+        # computed once here, so coords tensors are kept read-only to stop
+        # in-place edits from leaving them stale
         ########################
-        if len(coords) != 4:
+        if index is None:
+            try:
+                tensor = np.array(coords, dtype=np.float64)[None]
+            except ValueError:
+                raise ValueError("OCRBox requires 4 corner coordinates") from None
+            tensor.flags.writeable = False
+            index = 0
+        else:
+            if not isinstance(coords, np.ndarray) or coords.dtype != np.float64:
+                raise ValueError("OCRBox index requires a float64 ndarray tensor")
+            if coords.flags.writeable:
+                raise ValueError("OCRBox index requires a read-only tensor")
+            if not 0 <= index < len(coords):
+                raise ValueError(f"OCRBox index {index} out of range for {len(coords)} boxes")
+            tensor = coords
+        if tensor.ndim != 3 or tensor.shape[1:] != (4, 2):
             raise ValueError("OCRBox requires 4 corner coordinates")
         self.text = text
-        self.coords = coords
+        self._tensor = tensor
+        self._index = index
 
-    @property
-    def center(self) -> Tuple[float, float]:
-        xs, ys = zip(*self.coords)
-        return (sum(xs) / 4, sum(ys) / 4)
+        (x0,y0), (x1,y1), (x2,y2), (x3,y3) = tensor[index].tolist()
+        self.center = ((x0 + x1 + x2 + x3) / 4, (y0 + y1 + y2 + y3) / 4)
+        self.width = ((x1 - x0)**2 + (y1 - y0)**2) ** 0.5
+        self.height = ((x3 - x0)**2 + (y3 - y0)**2) ** 0.5
+        self.slope = (y1 - y0) / max(x1 - x0, 1e-6)
+        self.angle_deg = math.degrees(math.atan2(y1 - y0, x1 - x0))
 
     @property
-    def width(self) -> float:
-        (x0,y0), (x1,y1), *_ = self.coords
-        return ((x1 - x0)**2 + (y1 - y0)**2) ** 0.5
+    def coords(self) -> np.ndarray:
+        return self._tensor[self._index]
 
-    @property
-    def height(self) -> float:
-        (x0,y0), *_ , (x3,y3) = self.coords
-        return ((x3 - x0)**2 + (y3 - y0)**2) ** 0.5
 
-    @property
-    def slope(self) -> float:
-        (x0,y0), (x1,y1), *_ = self.coords
-        dx = max(x1 - x0, 1e-6)
-        dy = y1 - y0
-        return dy / dx
+def stack_coords(boxes: List[OCRBox]) -> np.ndarray:
+    ########################
+    # Return the corners of boxes as one (N,4,2) array
+    # When boxes are, in order, every row of one shared tensor (as built by
+    # load_ocr_json / correct_slope) that read-only tensor is returned as-is
+    ########################
+    if not boxes:
+        return np.empty((0, 4, 2))
+
+    tensor = boxes[0]._tensor
+    if len(tensor) == len(boxes) and all(b._tensor is tensor and b._index == i for i, b in enumerate(boxes)):
+        return tensor
+    return np.stack([b.coords for b in boxes])
+
+
+# ────────────────────────────────
+# Rotation Kernel
+# ────────────────────────────────
+@njit(cache=True, fastmath=True)
+def rotate_boxes(coords, angles, cx, cy):
+    ########################
+    # Rotate each box in coords (N,4,2) by -angles[i] (radians) about (cx, cy)
+    # Compiled with numba; cache=True keeps the compile cost to the first run
+    ########################
+    out = np.empty_like(coords)
+    for i in range(coords.shape[0]):
+        c = math.cos(-angles[i])
+        s = math.sin(-angles[i])
+        for k in range(4):
+            x = coords[i, k, 0] - cx
+            y = coords[i, k, 1] - cy
+            out[i, k, 0] = x * c - y * s + cx
+            out[i, k, 1] = x * s + y * c + cy
+    return out
 
 
 # ────────────────────────────────
@@ -56,26 +105,39 @@ def load_ocr_json(path: str) -> List[OCRBox]:
     #   - Polygon format: {"text": "foo", "coords": [[x0,y0],[x1,y1],[x2,y2],[x3,y3]]}
     #   - Rect format:    {"text": "foo", "x0":..,"y0":..,"x1":..,"y1":..}
     ########################
-    with open(path, "r") as f:
-        raw = json.load(f)
+    with open(path, "rb") as f:
+        raw = orjson.loads(f.read())
 
-    boxes = []
+    ########################
+    # Gather every polygon first, then convert them to a single
+    # (N,4,2) array in one call that all boxes index into
+    ########################
+    texts, polys = [], []
     for blk in raw["blocks"]:
-        text = blk.get("text", "")
-
         if "coords" in blk and len(blk["coords"]) == 4:
-            coords = [tuple(pt) for pt in blk["coords"]]
+            polys.append(blk["coords"])
 
         elif all(k in blk for k in ["x0", "y0", "x1", "y1"]):
             x0, y0, x1, y1 = blk["x0"], blk["y0"], blk["x1"], blk["y1"]
-            coords = [(x0,y0), (x1,y0), (x1,y1), (x0,y1)]
+            polys.append([(x0,y0), (x1,y0), (x1,y1), (x0,y1)])
 
         else:
             raise ValueError(f"Unrecognized OCR block format: {blk}")
 
-        boxes.append(OCRBox(text, coords))
+        texts.append(blk.get("text", ""))
 
-    return boxes
+    if not polys:
+        arr = np.empty((0, 4, 2))
+    else:
+        try:
+            arr = np.asarray(polys, dtype=np.float64)
+        except ValueError:
+            arr = None
+        if arr is None or arr.ndim != 3 or arr.shape[1:] != (4, 2):
+            raise ValueError("OCRBox requires 4 corner coordinates")
+    arr.flags.writeable = False
+
+    return [OCRBox(text, arr, i) for i, text in enumerate(texts)]
 
 
 # ────────────────────────────────
@@ -85,39 +147,31 @@ def correct_slope(boxes: List[OCRBox]) -> List[OCRBox]:
     ########################
     # Estimate slope per quadrant and correct coordinates
     # Uses box width as weight
+    # Works on the boxes' (N,4,2) corner tensor; slopes are averaged
+    # with NumPy ops, the rotation runs in rotate_boxes and the
+    # corrected boxes share the rotated tensor
     ########################
-    def get_quadrant(cx: float, cy: float) -> int:
-        if cx < 0.5 and cy < 0.5: return 0       # top-left
-        if cx >= 0.5 and cy < 0.5: return 1      # top-right
-        if cx < 0.5 and cy >= 0.5: return 2      # bottom-left
-        return 3                                 # bottom-right
-
-    slope_sums, weight_sums = {q:0 for q in range(4)}, {q:0 for q in range(4)}
-    for b in boxes:
-        q = get_quadrant(*b.center)
-        slope_sums[q] += b.slope * b.width
-        weight_sums[q] += b.width
-
-    avg_slopes = {
-        q: (slope_sums[q] / weight_sums[q] if weight_sums[q] > 0 else 0.0)
-        for q in range(4)
-    }
-
-    corrected = []
-    for b in boxes:
-        cx, cy = b.center
-        q = get_quadrant(cx, cy)
-        angle = math.atan(avg_slopes[q])
-
-        cos_a, sin_a = math.cos(-angle), math.sin(-angle)
-
-        new_coords = []
-        for (x,y) in b.coords:
-            x_shift, y_shift = x - 0.5, y - 0.5
-            x_rot = x_shift * cos_a - y_shift * sin_a
-            y_rot = x_shift * sin_a + y_shift * cos_a
-            new_coords.append((x_rot + 0.5, y_rot + 0.5))
-
-        corrected.append(OCRBox(b.text, new_coords))
-
-    return corrected
+    if not boxes:
+        return []
+
+    arr = stack_coords(boxes)
+
+    cx = arr[:, :, 0].mean(axis=1)
+    cy = arr[:, :, 1].mean(axis=1)
+
+    dx = np.maximum(arr[:, 1, 0] - arr[:, 0, 0], 1e-6)
+    dy = arr[:, 1, 1] - arr[:, 0, 1]
+    slope = dy / dx
+    width = np.hypot(arr[:, 1, 0] - arr[:, 0, 0], dy)
+
+    # 0 = top-left, 1 = top-right, 2 = bottom-left, 3 = bottom-right
+    q = (cx >= 0.5).astype(np.intp) + 2 * (cy >= 0.5).astype(np.intp)
+
+    slope_sums = np.bincount(q, weights=slope * width, minlength=4)
+    weight_sums = np.bincount(q, weights=width, minlength=4)
+    avg_slopes = np.divide(slope_sums, weight_sums, out=np.zeros(4), where=weight_sums > 0)
+
+    rotated = rotate_boxes(arr, np.arctan(avg_slopes[q]), 0.5, 0.5)
+    rotated.flags.writeable = False
+
+    return [OCRBox(b.text, rotated, i) for i, b in enumerate(boxes)]